@@ -19,12 +19,13 @@ setup(
         "fastapi>=0.115.0",
         "uvicorn[standard]>=0.32.0",
         "psutil>=5.9.0",
-        "requests>=2.32.0",
+        "httpx>=0.27.0",
     ],
     entry_points={
         "console_scripts": [
             "system-stats-service=system_stats.main:main",
             "system-stats-forwarder=system_stats.forwarder:main",
+            "system-stats-oneshot=system_stats.oneshot:main",
         ]
     },
     classifiers=[
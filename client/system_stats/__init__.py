@@ -1,11 +1,26 @@
 """System stats FastAPI service."""
-from importlib.metadata import version
+from __future__ import annotations
 
-from .api import create_app
+from typing import Any
 
 __all__ = ["create_app", "__version__"]
 
-try:
-    __version__ = version("system-stats-service")
-except Exception:  # pragma: no cover - fallback when package metadata missing
-    __version__ = "0.1.0"
+
+def __getattr__(name: str) -> Any:
+    # Resolved on first access so lightweight entry points (the one-shot agent)
+    # do not pay for FastAPI/pydantic or package metadata imports at startup.
+    if name == "create_app":
+        from .api import create_app
+
+        value: Any = create_app
+    elif name == "__version__":
+        from importlib.metadata import version
+
+        try:
+            value = version("system-stats-service")
+        except Exception:  # pragma: no cover - fallback when package metadata missing
+            value = "0.1.0"
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
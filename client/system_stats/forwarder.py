@@ -1,17 +1,28 @@
-"""Utility to forward system stats service data to the monitoring server."""
+"""Utility to forward system stats service data to one or more monitoring destinations."""
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
 import os
-import socket
 import time
-from typing import Any, Dict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote, urlparse
 
-import requests
+import httpx
+
+from .payload import attach_throughput, transform_payload
 
 DEFAULT_SYSTEM_STATS_URL = "http://127.0.0.1:5001/system"
 DEFAULT_MONITORING_METRICS_URL = "http://127.0.0.1:5050/metrics"
 DEFAULT_INTERVAL_SECONDS = 30
+DEFAULT_TIMEOUT_SECONDS = 10.0
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+DEFAULT_QUEUE_SIZE = 100
 
 
 def get_env(name: str, default: str) -> str:
@@ -19,101 +30,246 @@ def get_env(name: str, default: str) -> str:
     return value if value else default
 
 
-def fetch_system_stats(url: str) -> Dict[str, Any]:
-    response = requests.get(url, timeout=10)
+@dataclass(frozen=True)
+class Destination:
+    """A place each sample is delivered to, with its own delivery policy."""
+
+    name: str
+    url: str
+    timeout: float = DEFAULT_TIMEOUT_SECONDS
+    retries: int = DEFAULT_RETRIES
+    backoff: float = DEFAULT_BACKOFF_SECONDS
+
+    @property
+    def file_path(self) -> Optional[Path]:
+        """Target path for ``file://`` sinks, ``None`` for HTTP destinations."""
+        parsed = urlparse(self.url)
+        if parsed.scheme != "file":
+            return None
+        return Path(unquote(parsed.netloc + parsed.path)).expanduser()
+
+
+def parse_destinations(
+    raw: str,
+    fallback_url: str,
+    timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    retries: int = DEFAULT_RETRIES,
+    backoff: float = DEFAULT_BACKOFF_SECONDS,
+) -> List[Destination]:
+    """Build destinations from ``SYSTEM_STATS_FORWARD_DESTINATIONS``.
+
+    Accepts either a JSON array (of URLs or ``{name, url, timeout, retries, backoff}``
+    objects) or a comma-separated list of ``[name=]url`` entries. An empty value
+    yields a single ``primary`` destination pointing at ``fallback_url``.
+    """
+    defaults = {"timeout": timeout, "retries": retries, "backoff": backoff}
+    raw = raw.strip()
+    if not raw:
+        return [Destination(name="primary", url=fallback_url, **defaults)]
+
+    entries: List[Dict[str, Any]] = []
+    if raw.startswith("["):
+        for item in json.loads(raw):
+            entries.append({"url": item} if isinstance(item, str) else dict(item))
+    else:
+        for item in filter(None, (part.strip() for part in raw.split(","))):
+            name, sep, url = item.partition("=")
+            if sep and "://" not in name:
+                entries.append({"name": name.strip(), "url": url.strip()})
+            else:
+                entries.append({"url": item})
+
+    destinations: List[Destination] = []
+    for index, entry in enumerate(entries):
+        url = entry.get("url")
+        if not url:
+            raise ValueError(f"Destination #{index + 1} is missing a url")
+        scheme = urlparse(url).scheme
+        if scheme not in {"http", "https", "file"}:
+            raise ValueError(f"Unsupported destination scheme {scheme!r} in {url}")
+        destinations.append(
+            Destination(
+                name=str(entry.get("name") or f"dest{index + 1}"),
+                url=url,
+                timeout=float(entry.get("timeout", defaults["timeout"])),
+                retries=int(entry.get("retries", defaults["retries"])),
+                backoff=float(entry.get("backoff", defaults["backoff"])),
+            )
+        )
+    return destinations
+
+
+def _append_json_line(path: Path, payload: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(payload) + "\n")
+
+
+def _describe(exc: BaseException) -> str:
+    return str(exc) or type(exc).__name__
+
+
+async def fetch_system_stats(client: httpx.AsyncClient, url: str, timeout: float) -> Dict[str, Any]:
+    response = await client.get(url, timeout=timeout)
     response.raise_for_status()
     return response.json()
 
 
-def transform_payload(stats: Dict[str, Any], throughput: Dict[str, float]) -> Dict[str, Any]:
-    memory = stats.get("memory", {})
-    disk = stats.get("disk", {})
-    cpu = stats.get("cpu", {})
+async def post_metrics(client: httpx.AsyncClient, url: str, payload: Dict[str, Any], timeout: float) -> None:
+    response = await client.post(url, json=payload, timeout=timeout)
+    response.raise_for_status()
 
-    return {
-        "hostname": socket.gethostname(),
-        "cpu": float(cpu.get("percent", 0.0)),
-        "ram": float(memory.get("percent", 0.0)),
-        "disk": float(disk.get("percent", 0.0)),
-        "timestamp": int(time.time()),
-        "disk_read": throughput.get("read_mb_s", 0.0),
-        "disk_write": throughput.get("write_mb_s", 0.0),
-        "details": stats,
-    }
 
+class DestinationWorker:
+    """Delivers queued samples to one destination so a slow sink never blocks the others.
 
-def post_metrics(url: str, payload: Dict[str, Any]) -> None:
-    response = requests.post(url, json=payload, timeout=10)
-    response.raise_for_status()
+    The queue is bounded; when a destination falls behind, the oldest sample is
+    dropped rather than stalling the sampling loop.
+    """
 
+    def __init__(self, destination: Destination, client: httpx.AsyncClient, queue_size: int) -> None:
+        self.destination = destination
+        self._client = client
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max(1, queue_size))
 
-def run_forwarder() -> None:
+    def submit(self, payload: Dict[str, Any]) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+            self._queue.task_done()
+            logging.warning("[%s] queue full, dropped oldest sample", self.destination.name)
+        self._queue.put_nowait(payload)
+
+    async def run(self) -> None:
+        while True:
+            payload = await self._queue.get()
+            try:
+                await self._deliver(payload)
+            finally:
+                self._queue.task_done()
+
+    async def _send(self, payload: Dict[str, Any]) -> None:
+        path = self.destination.file_path
+        if path is not None:
+            await asyncio.to_thread(_append_json_line, path, payload)
+        else:
+            await post_metrics(self._client, self.destination.url, payload, self.destination.timeout)
+
+    async def _deliver(self, payload: Dict[str, Any]) -> None:
+        destination = self.destination
+        for attempt in range(destination.retries + 1):
+            try:
+                send = self._send(payload)
+                if destination.file_path is None:
+                    # The outer deadline bounds the whole attempt; httpx timeouts are per-operation.
+                    # File writes run in a thread that cannot be cancelled, so a deadline there
+                    # would only let a retry append a duplicate line while the first write finishes.
+                    send = asyncio.wait_for(send, timeout=destination.timeout)
+                await send
+                return
+            except Exception as exc:  # pylint: disable=broad-except
+                if attempt >= destination.retries:
+                    logging.warning(
+                        "[%s] delivery failed after %d attempt(s): %s",
+                        destination.name,
+                        attempt + 1,
+                        _describe(exc),
+                    )
+                    return
+                delay = min(MAX_BACKOFF_SECONDS, destination.backoff * (2 ** attempt))
+                logging.info(
+                    "[%s] delivery attempt %d failed (%s); retrying in %.1fs",
+                    destination.name,
+                    attempt + 1,
+                    _describe(exc),
+                    delay,
+                )
+                await asyncio.sleep(delay)
+
+
+async def run_forwarder_async() -> None:
     system_stats_url = get_env("SYSTEM_STATS_URL", DEFAULT_SYSTEM_STATS_URL)
     metrics_url = get_env("MONITORING_SERVER_METRICS_URL", DEFAULT_MONITORING_METRICS_URL)
     interval = float(get_env("SYSTEM_STATS_FORWARD_INTERVAL", str(DEFAULT_INTERVAL_SECONDS)))
+    timeout = float(get_env("SYSTEM_STATS_FORWARD_TIMEOUT", str(DEFAULT_TIMEOUT_SECONDS)))
+    queue_size = int(get_env("SYSTEM_STATS_FORWARD_QUEUE_SIZE", str(DEFAULT_QUEUE_SIZE)))
+    destinations = parse_destinations(
+        os.getenv("SYSTEM_STATS_FORWARD_DESTINATIONS", ""),
+        metrics_url,
+        timeout=timeout,
+        retries=int(get_env("SYSTEM_STATS_FORWARD_RETRIES", str(DEFAULT_RETRIES))),
+        backoff=float(get_env("SYSTEM_STATS_FORWARD_BACKOFF", str(DEFAULT_BACKOFF_SECONDS))),
+    )
 
     logging.basicConfig(
         level=os.getenv("SYSTEM_STATS_FORWARD_LOG_LEVEL", "INFO").upper(),
         format="%(asctime)s %(levelname)s %(message)s",
     )
+    # httpx logs every request at INFO; per-destination outcomes are logged below instead.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
     logging.info(
         "Forwarder started: polling %s every %.1fs -> %s",
         system_stats_url,
         interval,
-        metrics_url,
+        ", ".join(f"{dest.name}={dest.url}" for dest in destinations),
+    )
+
+    # One pooled client shared by the sampler and every HTTP destination. Idle
+    # connections are kept a little longer than the poll interval so each tick
+    # can reuse them instead of reconnecting (and re-negotiating TLS).
+    limits = httpx.Limits(
+        max_connections=max(10, 2 * len(destinations)),
+        max_keepalive_connections=max(5, len(destinations) + 1),
+        keepalive_expiry=interval + 5.0,
     )
+    async with httpx.AsyncClient(limits=limits) as client:
+        workers = [DestinationWorker(dest, client, queue_size) for dest in destinations]
+        tasks = [asyncio.create_task(worker.run()) for worker in workers]
 
-    last_disk_io: Dict[str, Any] | None = None
-    last_timestamp: float | None = None
+        last_disk_io: Dict[str, Any] | None = None
+        last_timestamp: float | None = None
+        loop = asyncio.get_running_loop()
 
-    while True:
-        start_time = time.time()
         try:
-            stats = fetch_system_stats(system_stats_url)
-            disk_io = stats.get("disk_io", {}) or {}
-            now = time.time()
-            read_rate = 0.0
-            write_rate = 0.0
-            if last_disk_io and last_timestamp:
-                elapsed = max(1e-6, now - last_timestamp)
-                read_rate = max(0.0, (disk_io.get("read_bytes", 0) - last_disk_io.get("read_bytes", 0)) / elapsed)
-                write_rate = max(0.0, (disk_io.get("write_bytes", 0) - last_disk_io.get("write_bytes", 0)) / elapsed)
-
-            throughput = {
-                "read_mb_s": read_rate / (1024 * 1024),
-                "write_mb_s": write_rate / (1024 * 1024),
-            }
-
-            stats.setdefault("throughput", {})
-            stats["throughput"].update(
-                {
-                    "disk_read_bytes_per_sec": read_rate,
-                    "disk_write_bytes_per_sec": write_rate,
-                    "disk_read_mb_per_sec": throughput["read_mb_s"],
-                    "disk_write_mb_per_sec": throughput["write_mb_s"],
-                }
-            )
+            while True:
+                start_time = loop.time()
+                try:
+                    stats = await fetch_system_stats(client, system_stats_url, timeout)
+                    disk_io = stats.get("disk_io", {}) or {}
+                    now = time.time()
+                    throughput = attach_throughput(stats, last_disk_io, last_timestamp, now)
 
-            payload = transform_payload(stats, throughput)
-            post_metrics(metrics_url, payload)
-            logging.info(
-                "Forwarded metrics cpu=%.1f%% ram=%.1f%% disk=%.1f%% read=%.2fMB/s write=%.2fMB/s",
-                payload["cpu"],
-                payload["ram"],
-                payload["disk"],
-                throughput["read_mb_s"],
-                throughput["write_mb_s"],
-            )
-            last_disk_io = disk_io
-            last_timestamp = now
-        except Exception as exc:  # pylint: disable=broad-except
-            logging.warning("Forwarding failed: %s", exc)
-        elapsed = time.time() - start_time
-        time.sleep(max(0.0, interval - elapsed))
+                    payload = transform_payload(stats, throughput)
+                    for worker in workers:
+                        worker.submit(payload)
+                    logging.info(
+                        "Sampled metrics cpu=%.1f%% ram=%.1f%% disk=%.1f%% read=%.2fMB/s write=%.2fMB/s",
+                        payload["cpu"],
+                        payload["ram"],
+                        payload["disk"],
+                        throughput["read_mb_s"],
+                        throughput["write_mb_s"],
+                    )
+                    last_disk_io = disk_io
+                    last_timestamp = now
+                except Exception as exc:  # pylint: disable=broad-except
+                    logging.warning("Sampling failed: %s", exc)
+                elapsed = loop.time() - start_time
+                await asyncio.sleep(max(0.0, interval - elapsed))
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def run_forwarder() -> None:
+    asyncio.run(run_forwarder_async())
 
 
 def main() -> None:
-    run_forwarder()
+    try:
+        run_forwarder()
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
@@ -0,0 +1,149 @@
+"""One-shot agent: collect host metrics in-process, post them once, and exit.
+
+Meant for cron and other short-lived schedulers. It skips the FastAPI service
+hop, imports only ``psutil`` plus the standard library, and keeps the disk
+counters needed for throughput rates in a small JSON state file between runs.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import psutil
+
+from .metrics import collect_system_metrics
+from .payload import attach_throughput, transform_payload
+
+DEFAULT_MONITORING_METRICS_URL = "http://127.0.0.1:5050/metrics"
+DEFAULT_TIMEOUT_SECONDS = 10.0
+STATE_VERSION = 1
+
+
+def _default_state_path() -> Path:
+    state_home = os.getenv("XDG_STATE_HOME") or str(Path.home() / ".local" / "state")
+    return Path(state_home) / "system-stats" / "oneshot-state.json"
+
+
+def resolve_state_path() -> Path:
+    override = os.getenv("SYSTEM_STATS_STATE_PATH")
+    if override:
+        return Path(override).expanduser()
+    return _default_state_path()
+
+
+def load_state(path: Path) -> Dict[str, Any]:
+    """Return the previous run's counters, or an empty dict when missing or unreadable."""
+    try:
+        state = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+        return {}
+    return state
+
+
+def save_state(path: Path, disk_io: Dict[str, Any], timestamp: float) -> None:
+    """Persist the latest counters atomically so a concurrent run never reads a torn file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    state = {"version": STATE_VERSION, "timestamp": timestamp, "disk_io": disk_io}
+    tmp_path.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def post_metrics(url: str, payload: Dict[str, Any], timeout: float) -> None:
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    # urlopen raises HTTPError for 4xx/5xx responses.
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+
+
+def _process_age_ms() -> Optional[float]:
+    """Milliseconds since the interpreter process was created (covers import time)."""
+    try:
+        if sys.platform.startswith("linux"):
+            # psutil derives create_time() from the whole-second boot time, which is
+            # too coarse here; /proc gives both values relative to boot in clock ticks.
+            uptime = float(Path("/proc/uptime").read_text().split()[0])
+            stat = Path("/proc/self/stat").read_text()
+            start_ticks = int(stat.rsplit(")", 1)[1].split()[19])
+            return max(0.0, (uptime - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000.0)
+        return max(0.0, (time.time() - psutil.Process().create_time()) * 1000.0)
+    except (psutil.Error, OSError, ValueError, IndexError):  # pragma: no cover - best effort measurement
+        return None
+
+
+def run_once() -> int:
+    startup_ms = _process_age_ms()
+    metrics_url = os.getenv("MONITORING_SERVER_METRICS_URL") or DEFAULT_MONITORING_METRICS_URL
+    timeout = float(os.getenv("SYSTEM_STATS_ONESHOT_TIMEOUT") or DEFAULT_TIMEOUT_SECONDS)
+    state_path = resolve_state_path()
+
+    logging.basicConfig(
+        level=os.getenv("SYSTEM_STATS_FORWARD_LOG_LEVEL", "INFO").upper(),
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+
+    state = load_state(state_path)
+
+    collect_started = time.perf_counter()
+    stats = collect_system_metrics()
+    collect_ms = (time.perf_counter() - collect_started) * 1000.0
+
+    now = time.time()
+    disk_io = stats.get("disk_io", {}) or {}
+    throughput = attach_throughput(stats, state.get("disk_io"), state.get("timestamp"), now)
+    stats["agent"] = {
+        "mode": "oneshot",
+        "startup_ms": startup_ms,
+        "collect_ms": collect_ms,
+    }
+    payload = transform_payload(stats, throughput)
+
+    post_started = time.perf_counter()
+    try:
+        post_metrics(metrics_url, payload, timeout)
+    except Exception as exc:  # pylint: disable=broad-except
+        logging.warning("One-shot forwarding to %s failed: %s", metrics_url, exc)
+        return 1
+    post_ms = (time.perf_counter() - post_started) * 1000.0
+
+    try:
+        save_state(state_path, disk_io, now)
+    except OSError as exc:
+        logging.warning("Could not write state file %s: %s", state_path, exc)
+
+    logging.info(
+        "Forwarded metrics cpu=%.1f%% ram=%.1f%% disk=%.1f%% read=%.2fMB/s write=%.2fMB/s",
+        payload["cpu"],
+        payload["ram"],
+        payload["disk"],
+        throughput["read_mb_s"],
+        throughput["write_mb_s"],
+    )
+    logging.info(
+        "One-shot timings: startup=%sms collect=%.0fms post=%.0fms",
+        f"{startup_ms:.0f}" if startup_ms is not None else "n/a",
+        collect_ms,
+        post_ms,
+    )
+    return 0
+
+
+def main() -> None:
+    sys.exit(run_once())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Payload shaping shared by the forwarder and the one-shot agent."""
+from __future__ import annotations
+
+import socket
+import time
+from typing import Any, Dict, Optional
+
+BYTES_PER_MB = 1024 * 1024
+
+
+def attach_throughput(
+    stats: Dict[str, Any],
+    last_disk_io: Optional[Dict[str, Any]],
+    last_timestamp: Optional[float],
+    now: float,
+) -> Dict[str, float]:
+    """Derive disk throughput from consecutive ``disk_io`` counters and record it on ``stats``."""
+    disk_io = stats.get("disk_io", {}) or {}
+    read_rate = 0.0
+    write_rate = 0.0
+    if last_disk_io and last_timestamp:
+        elapsed = max(1e-6, now - last_timestamp)
+        read_rate = max(0.0, (disk_io.get("read_bytes", 0) - last_disk_io.get("read_bytes", 0)) / elapsed)
+        write_rate = max(0.0, (disk_io.get("write_bytes", 0) - last_disk_io.get("write_bytes", 0)) / elapsed)
+
+    throughput = {
+        "read_mb_s": read_rate / BYTES_PER_MB,
+        "write_mb_s": write_rate / BYTES_PER_MB,
+    }
+
+    stats.setdefault("throughput", {})
+    stats["throughput"].update(
+        {
+            "disk_read_bytes_per_sec": read_rate,
+            "disk_write_bytes_per_sec": write_rate,
+            "disk_read_mb_per_sec": throughput["read_mb_s"],
+            "disk_write_mb_per_sec": throughput["write_mb_s"],
+        }
+    )
+    return throughput
+
+
+def transform_payload(stats: Dict[str, Any], throughput: Dict[str, float]) -> Dict[str, Any]:
+    memory = stats.get("memory", {})
+    disk = stats.get("disk", {})
+    cpu = stats.get("cpu", {})
+
+    return {
+        "hostname": socket.gethostname(),
+        "cpu": float(cpu.get("percent", 0.0)),
+        "ram": float(memory.get("percent", 0.0)),
+        "disk": float(disk.get("percent", 0.0)),
+        "timestamp": int(time.time()),
+        "disk_read": throughput.get("read_mb_s", 0.0),
+        "disk_write": throughput.get("write_mb_s", 0.0),
+        "details": stats,
+    }
@@ -0,0 +1,324 @@
+"""Pull-mode scraper that polls agents' ``/system`` endpoints and feeds the ingest path.
+
+Runs an asyncio event loop in a background thread. Each target is scraped on its
+own jittered schedule, a semaphore bounds how many scrapes are in flight, and
+results are buffered and written to the database in batches.
+"""
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+if TYPE_CHECKING:  # pragma: no cover - httpx is only needed once the scraper runs
+    import httpx
+
+BYTES_PER_MB = 1024 * 1024
+MIN_INTERVAL_SECONDS = 1.0
+
+MetricRecord = Tuple[Dict[str, Any], Optional[Dict[str, Any]]]
+
+
+@dataclass(frozen=True)
+class ScrapeTarget:
+    url: str
+    hostname: Optional[str] = None
+    interval: Optional[float] = None
+
+
+# Invalid file entries already reported, so a bad line is logged once rather than on every reload.
+_reported_invalid_entries = set()
+
+
+def _parse_target_entry(entry: Any) -> ScrapeTarget:
+    """Validate one targets-file entry the same way ``POST /scrape/targets`` validates a registration."""
+    if isinstance(entry, str):
+        entry = {"url": entry}
+    if not isinstance(entry, dict) or not entry.get("url"):
+        raise ValueError("entry must be a URL or an object with a url")
+    url = str(entry["url"])
+    if not url.startswith(("http://", "https://")):
+        raise ValueError("url must be http(s)")
+    interval = entry.get("interval")
+    if interval is not None:
+        interval = float(interval)
+        if not interval > 0:
+            raise ValueError("interval must be a positive number")
+    hostname = entry.get("hostname")
+    return ScrapeTarget(url=url, hostname=str(hostname) if hostname else None, interval=interval)
+
+
+def load_targets_file(path: str) -> List[ScrapeTarget]:
+    """Read targets from a JSON array (URLs or ``{url, hostname, interval}``) or one URL per line."""
+    try:
+        text = Path(path).read_text(encoding="utf-8")
+    except OSError as exc:
+        logging.warning("Cannot read scrape targets file %s: %s", path, exc)
+        return []
+
+    stripped = text.strip()
+    if stripped.startswith("["):
+        try:
+            entries = json.loads(stripped)
+        except ValueError as exc:
+            logging.warning("Invalid scrape targets file %s: %s", path, exc)
+            return []
+    else:
+        entries = [
+            line.strip() for line in stripped.splitlines() if line.strip() and not line.lstrip().startswith("#")
+        ]
+
+    targets = []
+    for entry in entries:
+        try:
+            targets.append(_parse_target_entry(entry))
+        except (TypeError, ValueError) as exc:
+            key = (path, json.dumps(entry, sort_keys=True, default=str))
+            if key not in _reported_invalid_entries:
+                _reported_invalid_entries.add(key)
+                logging.warning("Skipping invalid scrape target %s in %s: %s", key[1], path, exc)
+    return targets
+
+
+class _TargetState:
+    def __init__(self, target: ScrapeTarget) -> None:
+        self.target = target
+        self.last_disk_io: Optional[Dict[str, Any]] = None
+        self.last_timestamp: Optional[float] = None
+        self.scrapes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_scrape_at: Optional[int] = None
+        self.last_success_at: Optional[int] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.target.url,
+            "hostname": self.target.hostname,
+            "scrapes": self.scrapes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_scrape_at": self.last_scrape_at,
+            "last_success_at": self.last_success_at,
+            "last_duration_ms": self.last_duration_ms,
+            "last_error": self.last_error,
+        }
+
+
+def _attach_throughput(state: _TargetState, stats: Dict[str, Any], now: float) -> Tuple[float, float]:
+    """Mirror the forwarder's disk throughput calculation using this target's previous sample."""
+    disk_io = stats.get("disk_io", {}) or {}
+    read_rate = 0.0
+    write_rate = 0.0
+    if state.last_disk_io and state.last_timestamp:
+        elapsed = max(1e-6, now - state.last_timestamp)
+        read_rate = max(0.0, (disk_io.get("read_bytes", 0) - state.last_disk_io.get("read_bytes", 0)) / elapsed)
+        write_rate = max(0.0, (disk_io.get("write_bytes", 0) - state.last_disk_io.get("write_bytes", 0)) / elapsed)
+    state.last_disk_io = disk_io
+    state.last_timestamp = now
+
+    read_mb_s = read_rate / BYTES_PER_MB
+    write_mb_s = write_rate / BYTES_PER_MB
+    stats.setdefault("throughput", {})
+    stats["throughput"].update(
+        {
+            "disk_read_bytes_per_sec": read_rate,
+            "disk_write_bytes_per_sec": write_rate,
+            "disk_read_mb_per_sec": read_mb_s,
+            "disk_write_mb_per_sec": write_mb_s,
+        }
+    )
+    return read_mb_s, write_mb_s
+
+
+def build_record(state: _TargetState, stats: Dict[str, Any], now: float) -> MetricRecord:
+    read_mb_s, write_mb_s = _attach_throughput(state, stats, now)
+    hostname = (
+        state.target.hostname
+        or (stats.get("system") or {}).get("hostname")
+        or urlparse(state.target.url).hostname
+        or state.target.url
+    )
+    metric = {
+        "hostname": str(hostname),
+        "cpu": float((stats.get("cpu") or {}).get("percent", 0.0)),
+        "ram": float((stats.get("memory") or {}).get("percent", 0.0)),
+        "disk": float((stats.get("disk") or {}).get("percent", 0.0)),
+        "timestamp": int(now),
+        "disk_read": read_mb_s,
+        "disk_write": write_mb_s,
+    }
+    return metric, stats
+
+
+class Scraper:
+    """Scrapes every target returned by ``target_source`` and hands batches to ``ingest``."""
+
+    def __init__(
+        self,
+        target_source: Callable[[], List[ScrapeTarget]],
+        ingest: Callable[[List[MetricRecord]], Any],
+        interval: float = 30.0,
+        timeout: float = 10.0,
+        concurrency: int = 50,
+        jitter: float = 0.1,
+        reload_interval: float = 10.0,
+        flush_interval: float = 1.0,
+        batch_size: int = 500,
+    ) -> None:
+        self._target_source = target_source
+        self._ingest = ingest
+        self.interval = max(MIN_INTERVAL_SECONDS, interval)
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self.jitter = min(max(jitter, 0.0), 0.5)
+        self.reload_interval = reload_interval
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+
+        self._lock = threading.Lock()
+        self._states: Dict[str, _TargetState] = {}
+        self._tasks: Dict[str, "asyncio.Task[None]"] = {}
+        self._pending: List[MetricRecord] = []
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._main()), name="scraper", daemon=True)
+        self._thread.start()
+
+    def status(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [state.as_dict() for state in self._states.values()]
+
+    async def _main(self) -> None:
+        import httpx
+
+        # httpx logs every request at INFO; failures are reported per target instead.
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        limits = httpx.Limits(
+            max_connections=self.concurrency,
+            max_keepalive_connections=self.concurrency,
+            keepalive_expiry=self.interval + 5.0,
+        )
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=self.timeout) as client:
+            flusher = asyncio.create_task(self._flush_loop())
+            logging.info(
+                "Scraper started: interval=%.1fs concurrency=%d jitter=%.0f%%",
+                self.interval,
+                self.concurrency,
+                self.jitter * 100,
+            )
+            try:
+                while True:
+                    try:
+                        # Reading the targets file and SQLite can block; keep it off the loop so
+                        # in-flight scrapes and their timeouts are not stalled.
+                        targets = await asyncio.to_thread(self._target_source)
+                        self._reconcile(targets, client, semaphore)
+                    except Exception as exc:  # pylint: disable=broad-except
+                        logging.warning("Scrape target reload failed: %s", exc)
+                    await asyncio.sleep(self.reload_interval)
+            finally:
+                for task in self._tasks.values():
+                    task.cancel()
+                flusher.cancel()
+
+    def _reconcile(
+        self, target_list: List[ScrapeTarget], client: "httpx.AsyncClient", semaphore: asyncio.Semaphore
+    ) -> None:
+        targets = {target.url: target for target in target_list}
+
+        for url in list(self._tasks):
+            state = self._states[url]
+            if targets.get(url) != state.target:
+                self._tasks.pop(url).cancel()
+                if url not in targets:
+                    with self._lock:
+                        del self._states[url]
+
+        for url, target in targets.items():
+            if url in self._tasks:
+                continue
+            with self._lock:
+                state = self._states.get(url)
+                if state is None:
+                    state = self._states[url] = _TargetState(target)
+                state.target = target
+            self._tasks[url] = asyncio.create_task(self._scrape_loop(state, client, semaphore))
+
+    def _next_delay(self, interval: float) -> float:
+        return interval * (1.0 + random.uniform(-self.jitter, self.jitter))
+
+    async def _scrape_loop(
+        self, state: _TargetState, client: "httpx.AsyncClient", semaphore: asyncio.Semaphore
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        interval = max(MIN_INTERVAL_SECONDS, state.target.interval or self.interval)
+        # Spread first scrapes across the whole interval so targets do not fire in lockstep.
+        next_due = loop.time() + random.uniform(0.0, interval)
+        while True:
+            await asyncio.sleep(max(0.0, next_due - loop.time()))
+            async with semaphore:
+                flush_now = await self._scrape_once(state, client)
+            # Flush outside the semaphore so a batch write does not hold a concurrency slot.
+            if flush_now:
+                await self._flush()
+            next_due = max(next_due + self._next_delay(interval), loop.time())
+
+    async def _scrape_once(self, state: _TargetState, client: "httpx.AsyncClient") -> bool:
+        """Scrape one target; returns whether the pending batch is full and should be flushed."""
+        started = time.perf_counter()
+        try:
+            response = await client.get(state.target.url)
+            response.raise_for_status()
+            stats = response.json()
+            if not isinstance(stats, dict):
+                raise ValueError("response is not a JSON object")
+            now = time.time()
+            record = build_record(state, stats, now)
+        except Exception as exc:  # pylint: disable=broad-except
+            error = str(exc) or type(exc).__name__
+            with self._lock:
+                state.scrapes += 1
+                state.failures += 1
+                state.consecutive_failures += 1
+                state.last_scrape_at = int(time.time())
+                state.last_duration_ms = (time.perf_counter() - started) * 1000.0
+                state.last_error = error
+            logging.warning("Scrape of %s failed: %s", state.target.url, error)
+            return False
+
+        with self._lock:
+            state.scrapes += 1
+            state.consecutive_failures = 0
+            state.last_scrape_at = int(now)
+            state.last_success_at = int(now)
+            state.last_duration_ms = (time.perf_counter() - started) * 1000.0
+            state.last_error = None
+            self._pending.append(record)
+            return len(self._pending) >= self.batch_size
+
+    async def _flush(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            await asyncio.to_thread(self._ingest, batch)
+        except Exception as exc:  # pylint: disable=broad-except
+            logging.warning("Failed to store %d scraped metric(s): %s", len(batch), exc)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush()
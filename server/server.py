@@ -1,15 +1,20 @@
 """Flask-based monitoring server that stores metrics and serves a simple dashboard."""
+import hashlib
 import json
 import logging
 import os
 import sqlite3
+import threading
 import time
+from collections import OrderedDict
 from contextlib import closing
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
 
 from flask import Flask, jsonify, render_template, request
 
+from scraper import Scraper, ScrapeTarget, load_targets_file
+
 
 BASE_DIR = Path(__file__).resolve().parent
 DEFAULT_DB_PATH = BASE_DIR / "data" / "metrics.db"
@@ -19,6 +24,11 @@ TIMEFRAME_PRESETS: Dict[str, int] = {
     "24h": 24 * 60 * 60,
     "7d": 7 * 24 * 60 * 60,
 }
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+ALL_HOSTS_SCOPE = "*"
+SCRAPE_ENABLED = os.getenv("SCRAPE_ENABLED", "").lower() in {"1", "true", "yes", "on"}
+SCRAPE_TARGETS_FILE = os.getenv("SCRAPE_TARGETS_FILE")
 
 app = Flask(__name__, template_folder=str(BASE_DIR / "templates"))
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
@@ -55,6 +65,25 @@ def ensure_database() -> None:
             )
             """
         )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS data_versions (
+                scope TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                updated_at INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS scrape_targets (
+                url TEXT PRIMARY KEY,
+                hostname TEXT,
+                interval REAL,
+                registered_at INTEGER NOT NULL
+            )
+            """
+        )
         _ensure_column(conn, "metrics", "disk_read", "REAL DEFAULT 0")
         _ensure_column(conn, "metrics", "disk_write", "REAL DEFAULT 0")
         conn.commit()
@@ -73,43 +102,140 @@ def open_connection() -> sqlite3.Connection:
     return conn
 
 
-def insert_metric(payload: Dict[str, float]) -> None:
+def _bump_data_versions(conn: sqlite3.Connection, hostnames: Iterable[str]) -> None:
+    """Advance each host's version and the all-hosts version once, stamping the server time.
+
+    Read endpoints key their result cache and ETags on the version and use ``updated_at``
+    as ``Last-Modified``.
+    """
+    scopes = [f"host:{hostname}" for hostname in set(hostnames)]
+    if not scopes:
+        return
+    now_ts = int(time.time())
+    conn.executemany(
+        """
+        INSERT INTO data_versions (scope, version, updated_at) VALUES (?, 1, ?)
+        ON CONFLICT(scope) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at
+        """,
+        [(scope, now_ts) for scope in [*scopes, ALL_HOSTS_SCOPE]],
+    )
+
+
+def get_data_version(hostname: Optional[str]) -> Tuple[int, Optional[int]]:
+    """Return ``(version, updated_at)`` for ``hostname``, or for all hosts when it is empty."""
+    scope = f"host:{hostname}" if hostname else ALL_HOSTS_SCOPE
     with closing(open_connection()) as conn:
-        conn.execute(
-            """
-            INSERT INTO metrics(timestamp, hostname, cpu, ram, disk, disk_read, disk_write)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                payload["timestamp"],
-                payload["hostname"],
-                payload["cpu"],
-                payload["ram"],
-                payload["disk"],
-                payload.get("disk_read", 0.0),
-                payload.get("disk_write", 0.0),
-            ),
-        )
-        conn.commit()
+        row = conn.execute(
+            "SELECT version, updated_at FROM data_versions WHERE scope = ?", (scope,)
+        ).fetchone()
+    if not row:
+        return 0, None
+    return row["version"], row["updated_at"] or None
+
+
+def insert_metric(payload: Dict[str, float], conn: Optional[sqlite3.Connection] = None) -> None:
+    """Insert one metric row.
+
+    Without ``conn`` it commits and bumps the data version itself; callers passing their own
+    connection are responsible for both (see ``ingest_metrics``).
+    """
+    if conn is None:
+        with closing(open_connection()) as own_conn:
+            insert_metric(payload, own_conn)
+            _bump_data_versions(own_conn, [payload["hostname"]])
+            own_conn.commit()
+        return
+    conn.execute(
+        """
+        INSERT INTO metrics(timestamp, hostname, cpu, ram, disk, disk_read, disk_write)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            payload["timestamp"],
+            payload["hostname"],
+            payload["cpu"],
+            payload["ram"],
+            payload["disk"],
+            payload.get("disk_read", 0.0),
+            payload.get("disk_write", 0.0),
+        ),
+    )
 
 
-def upsert_host_details(hostname: str, details: Dict[str, Any]) -> None:
+def upsert_host_details(
+    hostname: str, details: Dict[str, Any], conn: Optional[sqlite3.Connection] = None
+) -> None:
+    """Store the latest snapshot for a host.
+
+    Like ``insert_metric``, it only commits and bumps the data version when no connection is given.
+    """
+    if conn is None:
+        with closing(open_connection()) as own_conn:
+            upsert_host_details(hostname, details, own_conn)
+            _bump_data_versions(own_conn, [hostname])
+            own_conn.commit()
+        return
     serialized = json.dumps(details)
     now_ts = int(time.time())
+    conn.execute(
+        """
+        INSERT INTO host_details (hostname, details_json, updated_at)
+        VALUES (?, ?, ?)
+        ON CONFLICT(hostname) DO UPDATE SET
+            details_json = excluded.details_json,
+            updated_at = excluded.updated_at
+        """,
+        (hostname, serialized, now_ts),
+    )
+
+
+def ingest_metrics(records: Iterable[Tuple[Dict[str, float], Optional[Dict[str, Any]]]]) -> int:
+    """Store ``(metric, details)`` pairs in a single transaction and return how many were written."""
+    count = 0
+    hostnames = set()
+    with closing(open_connection()) as conn:
+        for metric, details in records:
+            insert_metric(metric, conn)
+            if isinstance(details, dict):
+                upsert_host_details(metric["hostname"], details, conn)
+            hostnames.add(metric["hostname"])
+            count += 1
+        _bump_data_versions(conn, hostnames)
+        conn.commit()
+    return count
+
+
+def list_scrape_targets() -> List[Dict[str, Any]]:
+    with closing(open_connection()) as conn:
+        rows = conn.execute(
+            "SELECT url, hostname, interval, registered_at FROM scrape_targets ORDER BY url ASC"
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def register_scrape_target(url: str, hostname: Optional[str], interval: Optional[float]) -> None:
     with closing(open_connection()) as conn:
         conn.execute(
             """
-            INSERT INTO host_details (hostname, details_json, updated_at)
-            VALUES (?, ?, ?)
-            ON CONFLICT(hostname) DO UPDATE SET
-                details_json = excluded.details_json,
-                updated_at = excluded.updated_at
+            INSERT INTO scrape_targets (url, hostname, interval, registered_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                hostname = excluded.hostname,
+                interval = excluded.interval,
+                registered_at = excluded.registered_at
             """,
-            (hostname, serialized, now_ts),
+            (url, hostname, interval, int(time.time())),
         )
         conn.commit()
 
 
+def unregister_scrape_target(url: str) -> int:
+    with closing(open_connection()) as conn:
+        cursor = conn.execute("DELETE FROM scrape_targets WHERE url = ?", (url,))
+        conn.commit()
+        return cursor.rowcount
+
+
 def list_hosts() -> List[Dict[str, Any]]:
     summaries: Dict[str, Dict[str, Any]] = {}
     with closing(open_connection()) as conn:
@@ -148,6 +274,7 @@ def list_hosts() -> List[Dict[str, Any]]:
 def delete_host_metrics(hostname: str) -> int:
     with closing(open_connection()) as conn:
         cursor = conn.execute("DELETE FROM metrics WHERE hostname = ?", (hostname,))
+        _bump_data_versions(conn, [hostname])
         conn.commit()
         return cursor.rowcount
 
@@ -162,6 +289,7 @@ def delete_host(hostname: str) -> Dict[str, int]:
             "DELETE FROM host_details WHERE hostname = ?",
             (hostname,),
         ).rowcount
+        _bump_data_versions(conn, [hostname])
         conn.commit()
     return {"metrics": metrics_deleted, "details": details_deleted}
 
@@ -221,6 +349,100 @@ def get_host_details(hostname: str) -> Optional[Dict[str, Any]]:
     }
 
 
+class CachedResult(NamedTuple):
+    version: int
+    etag: str
+    body: bytes
+    last_modified: Optional[int]
+    expires_at: Optional[float]
+
+
+class ResultCache:
+    """Thread-safe LRU of serialized read responses, one entry per (endpoint, args...).
+
+    Each entry records the data version it was built at; a lookup with a different version
+    is a miss and the rebuilt body replaces the old one, so a query never holds more than
+    one body. Entries are bounded both by count and by total body size.
+    """
+
+    def __init__(self, maxsize: int, max_bytes: int) -> None:
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[Any, ...], CachedResult]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[Any, ...], version: int, now: float) -> Optional[CachedResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.version != version or (entry.expires_at is not None and now >= entry.expires_at):
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Tuple[Any, ...], entry: CachedResult) -> None:
+        with self._lock:
+            self._discard(key)
+            if self.maxsize <= 0 or len(entry.body) > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += len(entry.body)
+            while len(self._entries) > self.maxsize or self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, key: Tuple[Any, ...]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.body)
+
+
+_result_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_MAX_BYTES)
+
+
+def conditional_json(
+    key: Tuple[Any, ...],
+    version: int,
+    build: Callable[[], Optional[Tuple[Dict[str, Any], Optional[float]]]],
+    last_modified: Optional[int],
+):
+    """Serve ``build()``'s document from the result cache with ETag/Last-Modified validators.
+
+    ``build`` returns ``(document, expires_at)``, or ``None`` when there is nothing to serve
+    (in which case ``None`` is returned and nothing is cached). ``expires_at`` bounds how long
+    the entry stays valid when the result can change without a version bump (sliding windows).
+    ``version``/``last_modified`` are the data version and its server-side ``updated_at`` read
+    before building. Matching ``If-None-Match``/``If-Modified-Since`` requests get a 304.
+    """
+    now = time.time()
+    entry = _result_cache.get(key, version, now)
+    if entry is None:
+        built = build()
+        if built is None:
+            return None
+        document, expires_at = built
+        body = jsonify(document).get_data()
+        entry = CachedResult(
+            version=version,
+            etag=hashlib.sha1(body).hexdigest(),
+            body=body,
+            last_modified=last_modified,
+            expires_at=expires_at,
+        )
+        _result_cache.put(key, entry)
+
+    response = app.response_class(entry.body, mimetype="application/json")
+    response.set_etag(entry.etag)
+    # A second-resolution date from the current second could still be followed by another
+    # write in that second, so rely on the ETag alone until the second has passed.
+    if entry.last_modified and entry.last_modified < int(now):
+        response.last_modified = entry.last_modified
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
 @app.route("/metrics", methods=["POST"])
 def receive_metrics():
     payload = request.get_json(silent=True)
@@ -247,11 +469,7 @@ def receive_metrics():
         logging.warning("Invalid metric payload: %s", exc)
         return jsonify({"error": "Invalid field types"}), 400
 
-    insert_metric(metric)
-
-    details = payload.get("details")
-    if isinstance(details, dict):
-        upsert_host_details(metric["hostname"], details)
+    ingest_metrics([(metric, payload.get("details"))])
 
     return jsonify({"status": "ok"})
 
@@ -261,23 +479,32 @@ def data_endpoint():
     hostname = request.args.get("hostname")
     timeframe = request.args.get("timeframe")
 
-    rows = query_metrics(hostname, timeframe)
     if timeframe and timeframe not in TIMEFRAME_PRESETS:
         return jsonify({"error": "Unsupported timeframe"}), 400
 
-    metrics = [
-        {
-            "timestamp": row["timestamp"],
-            "hostname": row["hostname"],
-            "cpu": row["cpu"],
-            "ram": row["ram"],
-            "disk": row["disk"],
-            "disk_read": row["disk_read"],
-            "disk_write": row["disk_write"],
-        }
-        for row in rows
-    ]
-    return jsonify({"count": len(metrics), "data": metrics})
+    def build():
+        rows = query_metrics(hostname, timeframe)
+        metrics = [
+            {
+                "timestamp": row["timestamp"],
+                "hostname": row["hostname"],
+                "cpu": row["cpu"],
+                "ram": row["ram"],
+                "disk": row["disk"],
+                "disk_read": row["disk_read"],
+                "disk_write": row["disk_write"],
+            }
+            for row in rows
+        ]
+        # Without new data the result only changes once its oldest row leaves the window.
+        expires_at = metrics[0]["timestamp"] + TIMEFRAME_PRESETS[timeframe] if timeframe and metrics else None
+        return {"count": len(metrics), "data": metrics}, expires_at
+
+    version, updated_at = get_data_version(hostname)
+    # Windowed results also change as rows age out, which updated_at does not track, so
+    # they are validated by ETag only.
+    last_modified = None if timeframe else updated_at
+    return conditional_json(("data", hostname, timeframe), version, build, last_modified)
 
 
 @app.route("/details", methods=["GET"])
@@ -286,16 +513,24 @@ def details_endpoint():
     if not hostname:
         return jsonify({"error": "hostname query parameter required"}), 400
 
-    record = get_host_details(hostname)
-    if not record:
-        return jsonify({"error": "hostname not found"}), 404
+    def build():
+        record = get_host_details(hostname)
+        return (record, None) if record else None
 
-    return jsonify(record)
+    version, updated_at = get_data_version(hostname)
+    response = conditional_json(("details", hostname), version, build, updated_at)
+    if response is None:
+        return jsonify({"error": "hostname not found"}), 404
+    return response
 
 
 @app.route("/hosts", methods=["GET"])
 def hosts_endpoint():
-    return jsonify({"hosts": list_hosts()})
+    def build():
+        return {"hosts": list_hosts()}, None
+
+    version, updated_at = get_data_version(None)
+    return conditional_json(("hosts",), version, build, updated_at)
 
 
 @app.route("/hosts/<hostname>/clean", methods=["POST"])
@@ -310,6 +545,57 @@ def delete_host_endpoint(hostname: str):
     return jsonify({"status": "ok", **outcome})
 
 
+def scrape_targets_endpoint():
+    registered = {row["url"]: {**row, "source": "registered"} for row in list_scrape_targets()}
+    static = {}
+    if SCRAPE_TARGETS_FILE:
+        static = {
+            target.url: {"url": target.url, "hostname": target.hostname, "interval": target.interval, "source": "file"}
+            for target in load_targets_file(SCRAPE_TARGETS_FILE)
+        }
+    targets = {**static, **registered}
+    status = {entry["url"]: entry for entry in _scraper.status()} if _scraper is not None else {}
+    for url, target in targets.items():
+        target["status"] = status.get(url)
+    return jsonify({"targets": sorted(targets.values(), key=lambda item: item["url"])})
+
+
+def register_scrape_target_endpoint():
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not payload.get("url"):
+        return jsonify({"error": "JSON body with url required"}), 400
+
+    url = str(payload["url"])
+    if not url.startswith(("http://", "https://")):
+        return jsonify({"error": "url must be http(s)"}), 400
+    try:
+        interval = float(payload["interval"]) if payload.get("interval") is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid interval"}), 400
+    if interval is not None and interval <= 0:
+        return jsonify({"error": "Invalid interval"}), 400
+
+    hostname = payload.get("hostname")
+    register_scrape_target(url, str(hostname) if hostname else None, interval)
+    return jsonify({"status": "ok", "url": url})
+
+
+def unregister_scrape_target_endpoint():
+    url = request.args.get("url")
+    if not url:
+        return jsonify({"error": "url query parameter required"}), 400
+    removed = unregister_scrape_target(url)
+    return jsonify({"status": "ok", "targets_deleted": removed})
+
+
+if SCRAPE_ENABLED:
+    # Registered targets make the server issue GETs to caller-supplied URLs, so the
+    # management routes only exist when pull mode is switched on.
+    app.add_url_rule("/scrape/targets", view_func=scrape_targets_endpoint, methods=["GET"])
+    app.add_url_rule("/scrape/targets", view_func=register_scrape_target_endpoint, methods=["POST"])
+    app.add_url_rule("/scrape/targets", view_func=unregister_scrape_target_endpoint, methods=["DELETE"])
+
+
 @app.route("/dashboard", methods=["GET"])
 def dashboard():
     hostnames = get_known_hostnames()
@@ -326,8 +612,41 @@ def health():
     return jsonify({"status": "ok"})
 
 
+def _scrape_target_source() -> List[ScrapeTarget]:
+    targets = {}
+    if SCRAPE_TARGETS_FILE:
+        targets.update({target.url: target for target in load_targets_file(SCRAPE_TARGETS_FILE)})
+    for row in list_scrape_targets():
+        targets[row["url"]] = ScrapeTarget(url=row["url"], hostname=row["hostname"], interval=row["interval"])
+    return list(targets.values())
+
+
+_scraper: Optional[Scraper] = None
+
+
+def start_scraper() -> None:
+    """Start the pull scraper in a background thread when ``SCRAPE_ENABLED`` is set."""
+    global _scraper  # pylint: disable=global-statement
+    if not SCRAPE_ENABLED or _scraper is not None:
+        return
+    _scraper = Scraper(
+        _scrape_target_source,
+        ingest_metrics,
+        interval=float(os.getenv("SCRAPE_INTERVAL", "30")),
+        timeout=float(os.getenv("SCRAPE_TIMEOUT", "10")),
+        concurrency=int(os.getenv("SCRAPE_CONCURRENCY", "50")),
+        jitter=float(os.getenv("SCRAPE_JITTER", "0.1")),
+        reload_interval=float(os.getenv("SCRAPE_RELOAD_INTERVAL", "10")),
+        flush_interval=float(os.getenv("SCRAPE_FLUSH_INTERVAL", "1")),
+        batch_size=int(os.getenv("SCRAPE_BATCH_SIZE", "500")),
+    )
+    _scraper.start()
+
+
 if __name__ == "__main__":
     ensure_database()
+    start_scraper()
     app.run(host="0.0.0.0", port=5000)
 else:
     ensure_database()
+    start_scraper()